@@ -0,0 +1,301 @@
+"""
+WSGI fast path for hot anonymous GET routes.
+
+FastPathDispatcher sits in front of the Django application. The first
+anonymous GET for a whitelisted path goes through Django as usual and the
+response is captured; later anonymous GETs for that path are answered from
+memory with the captured headers, precompressed gzip/Brotli bodies and an
+ETag, without running the middleware stack, URL resolution or templates.
+
+Anything that could make the response differ falls through to Django
+unchanged: non-GET/HEAD methods, query strings, cookies, paths outside the
+whitelist and responses that are not plain cacheable 200s.
+
+Pages that embed a CSRF token (the contact form on home) cannot share one
+token between visitors, so the body is stored split around the token. Each
+request gets a fresh token and csrftoken cookie. The gzip body is put
+together from independently deflated segments, so only the 64-byte token is
+compressed per request.
+"""
+import hashlib
+import re
+import struct
+import threading
+import time
+import zlib
+from io import BytesIO
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.http.request import split_domain_port, validate_host
+from django.middleware.csrf import get_token
+from django.urls import Resolver404, resolve
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CSRF_FIELD_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")([A-Za-z0-9]{64})(")')
+
+# Gzip member header: deflate, no flags, zero mtime, max compression, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+
+# Response headers recomputed for every fast-path response
+RECOMPUTED_HEADERS = {'content-length', 'content-encoding', 'set-cookie', 'etag', 'vary'}
+
+
+def deflate_segment(data, final):
+    """Raw deflate data that does not refer back to anything before it"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_FULL_FLUSH)
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q > 0)"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:] in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def client_ip(environ):
+    """Same rule as website.views.get_client_ip, straight from the WSGI environ"""
+    forwarded = environ.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        return forwarded.split(',')[0]
+    return environ.get('REMOTE_ADDR')
+
+
+class CachedPage:
+    """A captured response, ready to be replayed"""
+
+    def __init__(self, route, status, headers, body):
+        self.route = route
+        self.status = status
+        self.status_code = int(status.split()[0])
+        self.headers = [(k, v) for k, v in headers if k.lower() not in RECOMPUTED_HEADERS]
+        vary = [v for k, v in headers if k.lower() == 'vary']
+        self.vary = ', '.join(vary + ['Accept-Encoding'])
+
+        # Body fragments between CSRF tokens; one fragment means no tokens
+        self.fragments = self._split(body)
+        self.has_csrf = len(self.fragments) > 1
+
+        if self.has_csrf:
+            self.deflated = [
+                deflate_segment(fragment, final=i == len(self.fragments) - 1)
+                for i, fragment in enumerate(self.fragments)
+            ]
+            self.etag = None
+            self.gzip = self.brotli = None
+        else:
+            self.etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+            self.gzip = GZIP_HEADER + deflate_segment(body, final=True) + struct.pack(
+                '<II', zlib.crc32(body) & 0xFFFFFFFF, len(body) & 0xFFFFFFFF
+            )
+            self.brotli = brotli.compress(body) if brotli else None
+        self.body = body
+
+    @staticmethod
+    def _split(body):
+        fragments = []
+        position = 0
+        for match in CSRF_FIELD_RE.finditer(body):
+            fragments.append(body[position:match.start(2)])
+            position = match.end(2)
+        fragments.append(body[position:])
+        return fragments
+
+    def respond(self, environ, start_response):
+        """Start the response; returns (status code, body iterable)"""
+        headers = list(self.headers)
+        headers.append(('Vary', self.vary))
+        encodings = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+
+        if self.has_csrf:
+            body, encoding, cookie = self._render_with_token(encodings)
+            headers.append(('Set-Cookie', cookie))
+        else:
+            headers.append(('ETag', self.etag))
+            if self.etag in (environ.get('HTTP_IF_NONE_MATCH') or ''):
+                start_response('304 Not Modified', headers)
+                return 304, []
+            if self.brotli and 'br' in encodings:
+                body, encoding = self.brotli, 'br'
+            elif 'gzip' in encodings:
+                body, encoding = self.gzip, 'gzip'
+            else:
+                body, encoding = self.body, None
+
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(len(body))))
+        start_response(self.status, headers)
+        return self.status_code, [] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+
+    def _render_with_token(self, encodings):
+        """Fill in a fresh CSRF token; returns (body, encoding, Set-Cookie value)"""
+        request = HttpRequest()
+        token = get_token(request).encode()
+        secret = request.META['CSRF_COOKIE']
+
+        # Same cookie CsrfViewMiddleware would set
+        response = HttpResponse()
+        response.set_cookie(
+            settings.CSRF_COOKIE_NAME,
+            secret,
+            max_age=settings.CSRF_COOKIE_AGE,
+            domain=settings.CSRF_COOKIE_DOMAIN,
+            path=settings.CSRF_COOKIE_PATH,
+            secure=settings.CSRF_COOKIE_SECURE,
+            httponly=settings.CSRF_COOKIE_HTTPONLY,
+            samesite=settings.CSRF_COOKIE_SAMESITE,
+        )
+        cookie = response.cookies[settings.CSRF_COOKIE_NAME].OutputString()
+
+        body = token.join(self.fragments)
+        if 'gzip' not in encodings:
+            return body, None, cookie
+        token_segment = deflate_segment(token, final=False)
+        parts = [GZIP_HEADER]
+        for deflated in self.deflated[:-1]:
+            parts += [deflated, token_segment]
+        parts += [self.deflated[-1], struct.pack('<II', zlib.crc32(body) & 0xFFFFFFFF, len(body) & 0xFFFFFFFF)]
+        return b''.join(parts), 'gzip', cookie
+
+
+class FastPathDispatcher:
+    """Serve whitelisted anonymous GETs from memory, pass everything else to Django"""
+
+    def __init__(self, application, paths):
+        self.application = application
+        self.paths = frozenset(paths)
+        # (scheme, path) -> CachedPage, or None when the path is not cacheable
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if (
+            environ.get('PATH_INFO') not in self.paths
+            or environ['REQUEST_METHOD'] not in ('GET', 'HEAD')
+            or environ.get('QUERY_STRING')
+            or environ.get('HTTP_COOKIE')
+            or not self.allowed_host(environ)
+        ):
+            return self.application(environ, start_response)
+
+        key = (environ.get('wsgi.url_scheme'), environ['PATH_INFO'])
+        page = self.pages.get(key, False)
+        if page is False:
+            return self.capture(key, environ, start_response)
+        if page is None:
+            return self.application(environ, start_response)
+
+        start = time.perf_counter()
+        if self.flooding(environ):
+            # Answer here: falling through would count the request again
+            status_code, result = self.reject(environ, start_response)
+            route, ratelimit = None, 'flood'
+        else:
+            status_code, result = page.respond(environ, start_response)
+            route, ratelimit = page.route, None
+        if getattr(settings, 'ACCESS_LOG_ENABLE', False):
+            from website.accesslog import get_writer
+            get_writer().write({
+                'ts': round(time.time(), 3),
+                'method': environ['REQUEST_METHOD'],
+                'path': environ['PATH_INFO'],
+                'route': route,
+                'status': status_code,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 3),
+                'queries': 0,
+                'ip': client_ip(environ),
+                'ratelimit': ratelimit,
+            })
+        return result
+
+    @staticmethod
+    def flooding(environ):
+        """Whether BotFilterMiddleware would reject this request"""
+        if not getattr(settings, 'BOT_FILTER_ENABLE', False):
+            return False
+        from website import botfilter
+        return not botfilter.get_filter().allow(botfilter.client_ip(environ))
+
+    @staticmethod
+    def reject(environ, start_response):
+        """The 429 BotFilterMiddleware sends; returns (status code, body iterable)"""
+        from website import botfilter
+        body = botfilter.REJECTED_MESSAGE.encode()
+        start_response('429 Too Many Requests', [
+            ('Content-Type', 'text/plain'),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', str(botfilter.get_filter().window)),
+        ])
+        return 429, [] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+
+    @staticmethod
+    def allowed_host(environ):
+        """Leave requests Django would reject with a 400 to Django"""
+        domain, _ = split_domain_port(environ.get('HTTP_HOST', ''))
+        return bool(domain) and validate_host(domain, settings.ALLOWED_HOSTS)
+
+    def capture(self, key, environ, start_response):
+        """Serve this request through Django and keep the response if it is cacheable"""
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            return start_response(status, headers, exc_info)
+
+        # Ask for an uncompressed body; compression is done here
+        django_environ = dict(environ, HTTP_ACCEPT_ENCODING='identity', REQUEST_METHOD='GET')
+        django_environ['wsgi.input'] = BytesIO()
+        result = self.application(django_environ, capture_start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        # Errors, redirects and 429s may be transient; try again next time
+        if captured['status'].startswith('200'):
+            page = self.build_page(key[1], captured['status'], captured['headers'], body)
+            with self.lock:
+                self.pages.setdefault(key, page)
+        return [] if environ['REQUEST_METHOD'] == 'HEAD' else [body]
+
+    @staticmethod
+    def build_page(path, status, headers, body):
+        """A CachedPage for a 200 response, or None if it must not be shared"""
+        names = {name.lower(): value for name, value in headers}
+        cache_control = names.get('cache-control', '')
+        if 'content-encoding' in names or 'private' in cache_control or 'no-store' in cache_control:
+            return None
+        vary = {
+            field.strip().lower()
+            for name, value in headers if name.lower() == 'vary'
+            for field in value.split(',')
+        }
+        if vary - {'cookie', 'accept-encoding'}:
+            return None
+
+        # The only cookie we can reproduce is a fresh CSRF token, and only
+        # when the token appears in the body as a form field we can splice.
+        cookies = [value for name, value in headers if name.lower() == 'set-cookie']
+        if any(not cookie.lstrip().startswith(f'{settings.CSRF_COOKIE_NAME}=') for cookie in cookies):
+            return None
+        if bool(cookies) != bool(CSRF_FIELD_RE.search(body)):
+            return None
+
+        try:
+            route = resolve(path).view_name
+        except Resolver404:
+            route = None
+        return CachedPage(route, status, headers, body)
@@ -53,6 +53,8 @@ CACHES = {
 
 
 MIDDLEWARE = [
+    'website.middleware.AccessLogMiddleware',
+    'website.middleware.BotFilterMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,8 +64,44 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'website.middleware.RateLimitMiddleware',
+    'website.middleware.ProfilingMiddleware',
 ]
 
+# Front-line flood filter (see website.botfilter). Requests per client IP and
+# per /24 (IPv6: /64) subnet are estimated over BOT_FILTER_WINDOW seconds in
+# fixed memory: BUCKETS x DEPTH x WIDTH 32-bit counters (~384 KB per worker).
+# Each worker keeps its own sketch and only counts the requests it serves, so
+# a client is cut off at about workers x BOT_FILTER_IP_LIMIT requests, and
+# only as evenly as gunicorn spreads its connections over the workers.
+# BOT_FILTER_TRUSTED_PROXIES is how many proxies append to X-Forwarded-For in
+# front of gunicorn (1 for the Heroku router, 2 with a CDN in front of it,
+# 0 when clients connect directly and REMOTE_ADDR is used).
+BOT_FILTER_ENABLE = True
+BOT_FILTER_TRUSTED_PROXIES = 1
+BOT_FILTER_WINDOW = 60
+BOT_FILTER_IP_LIMIT = 300
+BOT_FILTER_SUBNET_LIMIT = 1200
+BOT_FILTER_BUCKETS = 6
+BOT_FILTER_WIDTH = 4096
+BOT_FILTER_DEPTH = 4
+
+# Structured JSONL access log (see website.accesslog). Analyse rotated logs
+# with: python manage.py analyze_access_log logs/access.jsonl*
+ACCESS_LOG_ENABLE = True
+ACCESS_LOG_PATH = BASE_DIR / 'logs' / 'access.jsonl'
+ACCESS_LOG_MAX_BYTES = 50 * 1024 * 1024
+ACCESS_LOG_BACKUP_COUNT = 10
+ACCESS_LOG_QUEUE_SIZE = 10000  # records buffered before new ones are dropped
+
+# Sampled per-request profiling (see website.middleware.ProfilingMiddleware).
+# Disabled, the middleware drops out of the stack entirely. Reports are served
+# per worker at /profiling/ to staff users.
+PROFILING_ENABLE = False
+PROFILING_SAMPLE_RATE = 0.01     # fraction of requests traced with tracemalloc
+PROFILING_CPROFILE_RATE = 0.001  # fraction of requests run under cProfile
+PROFILING_BUFFER_SIZE = 200      # profiles kept per worker
+PROFILING_TOP_N = 10             # allocation sites / functions kept per profile
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 ROOT_URLCONF = 'STEMCURES.urls'
@@ -105,6 +143,14 @@ TEMPLATES = [
     },
 ]
 
+# Stream public pages so the <head> (stylesheets) reaches the browser before
+# the body has finished rendering. See website/streaming.py.
+STREAMING_RENDER = True
+
+# Paths answered from memory for anonymous GETs by STEMCURES.fastpath in
+# front of the middleware stack. Empty to disable.
+FAST_PATH_ROUTES = ['/', '/faculty/']
+
 WSGI_APPLICATION = 'STEMCURES.wsgi.application'
 
 
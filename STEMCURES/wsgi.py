@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'STEMCURES.settings')
 
 application = get_wsgi_application()
+
+# Serve hot anonymous GETs from memory in front of Django; see fastpath.py
+from django.conf import settings
+from STEMCURES.fastpath import FastPathDispatcher
+
+if getattr(settings, 'FAST_PATH_ROUTES', None):
+    application = FastPathDispatcher(application, settings.FAST_PATH_ROUTES)
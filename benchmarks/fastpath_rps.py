@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Requests per second per worker with and without the WSGI fast path.
+
+Calls the WSGI application in-process from a single thread, which is what
+one sync gunicorn worker does, for each fast-path route. The same anonymous
+gzip-accepting GET is sent straight to Django and through
+STEMCURES.fastpath.FastPathDispatcher.
+
+Usage:
+    python benchmarks/fastpath_rps.py [--duration 3]
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+# Same settings as worker_models.py: the flood filter is off
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+
+def environ_for(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': BytesIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def requests_per_second(application, path, duration):
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    count = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        body = application(environ_for(path), start_response)
+        for _ in body:
+            pass
+        if hasattr(body, 'close'):
+            body.close()
+        count += 1
+    return count / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds measured per case')
+    options = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from STEMCURES.fastpath import FastPathDispatcher
+
+    django_app = get_wsgi_application()
+    fast_app = FastPathDispatcher(django_app, settings.FAST_PATH_ROUTES)
+
+    print(f"{'route':<12}{'django rps':>12}{'fast path rps':>15}{'gain':>8}")
+    for path in settings.FAST_PATH_ROUTES:
+        requests_per_second(django_app, path, 0.5)
+        requests_per_second(fast_app, path, 0.5)
+        slow = requests_per_second(django_app, path, options.duration)
+        fast = requests_per_second(fast_app, path, options.duration)
+        print(f'{path:<12}{slow:>12.0f}{fast:>15.0f}{fast / slow:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
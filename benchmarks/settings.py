@@ -0,0 +1,9 @@
+"""
+Settings shared by the benchmark harnesses.
+
+The load generator sends hundreds of requests per second from one address,
+which the flood filter would start answering with 429s within a second.
+"""
+from STEMCURES.settings import *  # noqa: F401,F403
+
+BOT_FILTER_ENABLE = False
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Time-to-first-byte of streamed pages versus the buffered render().
+
+Calls the WSGI application in-process for each public page, once with
+STREAMING_RENDER off and once with it on, and measures how long it takes for
+the first body chunk and for the complete body to be produced.
+
+Usage:
+    python benchmarks/streaming_ttfb.py [--iterations 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+# Same settings as worker_models.py: the flood filter is off
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+ROUTES = ['/', '/faculty/', '/faculty/saif/']
+
+
+def environ_for(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': BytesIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def measure(application, path):
+    """Return (seconds to first body chunk, seconds to last chunk)"""
+    start = time.perf_counter()
+    body = application(environ_for(path), lambda status, headers: None)
+    first = None
+    for chunk in body:
+        if chunk and first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    if hasattr(body, 'close'):
+        body.close()
+    return first, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500)
+    options = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.core.wsgi import get_wsgi_application
+    from django.test.utils import override_settings
+
+    application = get_wsgi_application()
+
+    print(f"{'route':<16}{'mode':<11}{'ttfb p50':>10}{'total p50':>11}")
+    for path in ROUTES:
+        for streaming in (False, True):
+            with override_settings(STREAMING_RENDER=streaming):
+                for _ in range(20):
+                    measure(application, path)
+                samples = [measure(application, path) for _ in range(options.iterations)]
+            ttfb = statistics.median(s[0] for s in samples) * 1000
+            total = statistics.median(s[1] for s in samples) * 1000
+            mode = 'stream' if streaming else 'render()'
+            print(f'{path:<16}{mode:<11}{ttfb:>8.3f}ms{total:>9.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
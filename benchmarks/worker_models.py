@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Compare gunicorn worker models on this app's real routes.
+
+Starts gunicorn with gunicorn.conf.py once per worker model, drives the public
+GET routes with a fixed number of concurrent keep-alive clients, and records
+throughput, latency percentiles and errors for each model. This is repeated
+--runs times, with the model order rotated each run. Every run and the winning
+model are written to benchmarks/results/worker_models.json.
+
+A model that fails any request is out. The fastest remaining model (by median
+requests per second) only wins if it beats the next one by more than the
+run-to-run spread of either; otherwise the result is no clear winner and
+BASELINE_MODEL stays the default.
+
+Usage:
+    python benchmarks/worker_models.py [--runs 3] [--duration 10] [--concurrency 16]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_PATH = BASE_DIR / 'benchmarks' / 'results' / 'worker_models.json'
+
+ROUTES = ['/', '/faculty/', '/faculty/saif/']
+
+# gunicorn's own default; kept unless another model is clearly faster
+BASELINE_MODEL = 'sync'
+
+
+def free_port():
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    """Poll the server until it answers or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client(args):
+    """Issue requests round-robin over ROUTES until the deadline"""
+    port, deadline, offset = args
+    latencies = []
+    errors = 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = offset
+    while time.monotonic() < deadline:
+        path = ROUTES[i % len(ROUTES)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'identity'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def run_model(model, duration, concurrency, warmup):
+    """Benchmark one worker model and return its metrics"""
+    port = free_port()
+    # No worker recycling during the run: a restart drops the keep-alive
+    # connections gthread and asgi hold (sync closes every connection), and
+    # the client would count that against the worker model.
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=model,
+        GUNICORN_MAX_REQUESTS='1000000',
+        DJANGO_SETTINGS_MODULE='benchmarks.settings',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=BASE_DIR, env=env,
+    )
+    try:
+        if not wait_until_ready(port):
+            return {'model': model, 'error': 'server did not start'}
+
+        with multiprocessing.Pool(concurrency) as pool:
+            # Warm up every worker before measuring
+            pool.map(client, [(port, time.monotonic() + warmup, i) for i in range(concurrency)])
+            deadline = time.monotonic() + duration
+            results = pool.map(client, [(port, deadline, i) for i in range(concurrency)])
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies = sorted(l for result in results for l in result[0])
+    errors = sum(result[1] for result in results)
+    return {
+        'model': model,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def summarise(model, runs):
+    """Medians and spread of one model's runs"""
+    rps = [run['rps'] for run in runs if 'rps' in run]
+    p95 = [run['p95_ms'] for run in runs if run.get('p95_ms') is not None]
+    return {
+        'model': model,
+        'errors': sum(run.get('errors', 0) for run in runs),
+        'failed_runs': sum(1 for run in runs if 'error' in run),
+        'rps_median': round(statistics.median(rps), 1) if rps else 0,
+        'rps_spread': round(max(rps) - min(rps), 1) if rps else None,
+        'p95_ms_median': statistics.median(p95) if p95 else None,
+    }
+
+
+def pick_winner(summaries):
+    """The clearly fastest error-free model, or None if there is no clear winner"""
+    candidates = sorted(
+        (s for s in summaries if not s['errors'] and not s['failed_runs']),
+        key=lambda s: s['rps_median'], reverse=True,
+    )
+    if not candidates:
+        return None
+    if len(candidates) == 1:
+        return candidates[0]['model']
+    best, runner_up = candidates[0], candidates[1]
+    noise = max(best['rps_spread'], runner_up['rps_spread'])
+    if best['rps_median'] - runner_up['rps_median'] > noise:
+        return best['model']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='runs per model')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds measured per model')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of warm-up per model')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--models', nargs='+', default=['sync', 'gthread', 'asgi'])
+    parser.add_argument('--output', type=Path, default=RESULTS_PATH)
+    options = parser.parse_args()
+
+    models = []
+    for model in options.models:
+        if model == 'asgi' and find_spec('uvicorn') is None:
+            print('skipping asgi: uvicorn is not installed')
+            continue
+        models.append(model)
+
+    runs = {model: [] for model in models}
+    for run in range(options.runs):
+        # Rotate the order so no model always runs on a cold or warm machine
+        for model in models[run % len(models):] + models[:run % len(models)]:
+            print(f'run {run + 1}/{options.runs}: benchmarking {model} ...', flush=True)
+            result = run_model(model, options.duration, options.concurrency, options.warmup)
+            print(f"  {result}")
+            runs[model].append(result)
+
+    summaries = [summarise(model, runs[model]) for model in models]
+    winner = pick_winner(summaries)
+
+    report = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'cpu_count': os.cpu_count(),
+        'routes': ROUTES,
+        'duration': options.duration,
+        'concurrency': options.concurrency,
+        'runs': options.runs,
+        'summary': summaries,
+        'results': runs,
+        'winner': winner,
+        'default': winner or BASELINE_MODEL,
+    }
+    options.output.parent.mkdir(parents=True, exist_ok=True)
+    options.output.write_text(json.dumps(report, indent=2) + '\n')
+    for summary in summaries:
+        print(f"  {summary}")
+    print(f"winner: {winner or f'none, keep {BASELINE_MODEL}'} (written to {options.output})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# gunicorn.conf.py
+"""
+Gunicorn configuration for STEMCURES.
+
+Workers and threads are sized from the CPU count and the memory available to
+the container, so the same file works on a small dyno and on a larger host.
+Every value can be overridden from the environment:
+
+    WEB_CONCURRENCY           number of worker processes
+    GUNICORN_WORKER_CLASS     sync, gthread or asgi (default: sync)
+    GUNICORN_THREADS          threads per worker for gthread
+    GUNICORN_WORKER_MEMORY_MB memory budget per worker used for sizing
+    GUNICORN_THREAD_MEMORY_MB memory budget per extra gthread thread
+    GUNICORN_MAX_REQUESTS     recycle a worker after this many requests
+    GUNICORN_TIMEOUT          worker timeout in seconds
+
+The default worker class is the one benchmarks/worker_models.py picked on
+this app's routes (see benchmarks/results/worker_models.json). No model
+failed requests; gthread's median throughput was ahead of sync by less than
+the run-to-run spread and its p95 latency was worse, so there was no clear
+winner and sync, gunicorn's own default, stays. Re-run the benchmark after
+changing the stack.
+"""
+import importlib.util
+import os
+import sys
+
+
+def _env_int(name, default):
+    """Read a positive integer from the environment"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return default
+
+
+def _cpu_quota():
+    """CPUs allowed by the cgroup CPU quota, or None without a quota"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    # "max" (v2) and -1 (v1) both mean no quota
+    if not quota.isdigit() or not period.isdigit() or not int(period):
+        return None
+    return max(1, -(-int(quota) // int(period)))
+
+
+def _cpu_count():
+    """CPUs this process may actually run on (affinity, capped by the cgroup quota)"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    quota = _cpu_quota()
+    return min(count, quota) if quota else count
+
+
+def _memory_limit_mb():
+    """Memory available to the container in MB (cgroup limit, then physical RAM)"""
+    for path in ('/sys/fs/cgroup/memory.max',
+                 '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number instead of "max"
+        if raw.isdigit() and int(raw) < 1 << 50:
+            return int(raw) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 512
+
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'asgi': 'uvicorn.workers.UvicornWorker',
+}
+
+cpu_count = _cpu_count()
+memory_limit_mb = _memory_limit_mb()
+worker_memory_mb = _env_int('GUNICORN_WORKER_MEMORY_MB', 128)
+thread_memory_mb = _env_int('GUNICORN_THREAD_MEMORY_MB', 16)
+
+# Classic 2 * CPU + 1, capped by how many workers fit in memory
+workers = _env_int(
+    'WEB_CONCURRENCY',
+    max(1, min(2 * cpu_count + 1, memory_limit_mb // worker_memory_mb)),
+)
+
+worker_model = os.environ.get('GUNICORN_WORKER_CLASS', 'sync').lower()
+if worker_model not in WORKER_CLASSES:
+    print(f"gunicorn.conf: unknown worker class {worker_model!r}, using sync", file=sys.stderr)
+    worker_model = 'sync'
+if worker_model == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+    print("gunicorn.conf: uvicorn is not installed, using sync", file=sys.stderr)
+    worker_model = 'sync'
+
+worker_class = WORKER_CLASSES[worker_model]
+
+if worker_model == 'asgi':
+    wsgi_app = 'STEMCURES.asgi:application'
+else:
+    wsgi_app = 'STEMCURES.wsgi:application'
+
+
+
+def _default_threads():
+    """
+    Threads per gthread worker.
+
+    Aim for about four requests in flight per CPU across all workers, which
+    covers time spent waiting on the database and SMTP without oversubscribing
+    the GIL, and only add threads that fit in the memory left to each worker
+    after its base budget.
+    """
+    wanted = max(2, -(-4 * cpu_count // workers))
+    spare_mb = memory_limit_mb // workers - worker_memory_mb
+    return max(1, min(wanted, 1 + spare_mb // thread_memory_mb))
+
+
+# Threads only help the gthread worker
+threads = _env_int('GUNICORN_THREADS', _default_threads()) if worker_model == 'gthread' else 1
+
+# Recycle workers periodically to cap slow memory growth; the jitter keeps
+# them from all restarting at the same moment.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = max(1, max_requests // 10)
+
+# Load Django once in the master so workers fork with shared, warm memory
+preload_app = True
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,168 @@
+# website/accesslog.py
+"""
+Structured JSONL access log.
+
+Request threads only put records on an in-memory queue; a background thread
+per worker process serialises them in batches and appends them to the log
+file. When the file grows past ACCESS_LOG_MAX_BYTES it is rotated to
+``<path>.1.gz``, ``<path>.2.gz`` ... keeping ACCESS_LOG_BACKUP_COUNT files.
+All gunicorn workers share one file; an advisory lock serialises writes and
+rotation, and writers reopen the file when another process has rotated it.
+Records lost to a full queue or a failed write are counted, logged as a
+warning and reported in a ``dropped`` field on the next record written.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on records serialised per write
+BATCH_SIZE = 500
+
+
+class BufferedJSONLWriter:
+    """Non-blocking JSONL writer with size-based, gzip-compressed rotation"""
+
+    def __init__(self, path, max_bytes, backup_count, queue_size=10000):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._reported = 0
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def write(self, record):
+        """Queue a record; drops it rather than block if the queue is full"""
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        # Threads do not survive fork, so each worker (and a preloading
+        # master) starts its own queue and writer thread on first use.
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name='accesslog-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def close(self, timeout=5):
+        """Flush queued records; called at interpreter exit"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        stream = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            dropped = self.dropped
+            if records and dropped > self._reported:
+                logger.warning('Access log dropped %d record(s)', dropped - self._reported)
+                records[0] = dict(records[0], dropped=dropped - self._reported)
+            lines = ''.join(
+                json.dumps(record, separators=(',', ':'), default=str) + '\n'
+                for record in records
+            ).encode()
+            try:
+                stream = self._write(stream, lines)
+                if records:
+                    self._reported = dropped
+            except OSError:
+                self.dropped += len(records)
+                stream = None
+            if stop:
+                if stream:
+                    stream.close()
+                return
+
+    def _write(self, stream, data):
+        if stream is None:
+            stream = open(self.path, 'ab')
+        if fcntl:
+            fcntl.flock(stream, fcntl.LOCK_EX)
+        try:
+            # Another process may have rotated the file under us
+            if self._rotated(stream):
+                stream.close()
+                stream = open(self.path, 'ab')
+                if fcntl:
+                    fcntl.flock(stream, fcntl.LOCK_EX)
+            stream.write(data)
+            stream.flush()
+            if stream.tell() >= self.max_bytes:
+                self._rotate()
+        finally:
+            if fcntl:
+                fcntl.flock(stream, fcntl.LOCK_UN)
+        return stream
+
+    def _rotated(self, stream):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _rotate(self):
+        """Shift <path>.N.gz up by one and compress the live file to <path>.1.gz"""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{index}.gz'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}.gz')
+        rotating = f'{self.path}.rotating'
+        os.replace(self.path, rotating)
+        if self.backup_count:
+            with open(rotating, 'rb') as source, gzip.open(f'{self.path}.1.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+        os.remove(rotating)
+
+
+_writer = None
+
+
+def get_writer():
+    """The process-wide writer configured from settings"""
+    global _writer
+    if _writer is None:
+        _writer = BufferedJSONLWriter(
+            settings.ACCESS_LOG_PATH,
+            max_bytes=getattr(settings, 'ACCESS_LOG_MAX_BYTES', 50 * 1024 * 1024),
+            backup_count=getattr(settings, 'ACCESS_LOG_BACKUP_COUNT', 10),
+            queue_size=getattr(settings, 'ACCESS_LOG_QUEUE_SIZE', 10000),
+        )
+    return _writer
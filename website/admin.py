@@ -120,7 +120,11 @@ from django.core.cache import cache
 from django.shortcuts import render
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
-from .models import ContactSubmission
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+from .models import ContactSubmission, SubmissionDailyRollup
+from . import rollups
 
 class RateLimitedLoginView(auth_views.LoginView):
     """Custom login view with rate limiting"""
@@ -151,14 +155,59 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
     )
     
     actions = ['mark_as_read', 'mark_as_unread']
+    change_list_template = 'admin/website/contactsubmission/change_list.html'
+    
+    # Number of days shown on the analytics dashboard
+    dashboard_days = 30
+    
+    def get_urls(self):
+        urls = [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view),
+                 name='website_contactsubmission_dashboard'),
+        ]
+        return urls + super().get_urls()
+    
+    def dashboard_view(self, request):
+        """Submissions per day, per interest and unread backlog, read from the rollups only"""
+        since = timezone.localdate() - timedelta(days=self.dashboard_days - 1)
+        recent = SubmissionDailyRollup.objects.filter(day__gte=since)
+        
+        days = {}
+        for row in recent:
+            day = days.setdefault(row.day, {'day': row.day, 'total': 0, 'unread': 0})
+            day['total'] += row.total
+            day['unread'] += row.unread
+        
+        labels = dict(ContactSubmission.INTEREST_CHOICES)
+        interests = [
+            {**row, 'interest': labels.get(row['interest'], 'Unspecified')}
+            for row in SubmissionDailyRollup.objects.order_by()
+            .values('interest').annotate(total=Sum('total'), unread=Sum('unread'))
+            .filter(total__gt=0).order_by('-total')
+        ]
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Submission analytics',
+            'dashboard_days': self.dashboard_days,
+            'days': sorted(days.values(), key=lambda d: d['day'], reverse=True),
+            'interests': interests,
+            'total': sum(row['total'] for row in interests),
+            'unread': sum(row['unread'] for row in interests),
+        }
+        return render(request, 'admin/website/contactsubmission/dashboard.html', context)
+    
+    def delete_queryset(self, request, queryset):
+        rollups.delete_submissions(queryset)
     
     def mark_as_read(self, request, queryset):
-        updated = queryset.update(is_read=True)
+        updated = rollups.set_read(queryset, True)
         self.message_user(request, f'{updated} submission(s) marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
     
     def mark_as_unread(self, request, queryset):
-        updated = queryset.update(is_read=False)
+        updated = rollups.set_read(queryset, False)
         self.message_user(request, f'{updated} submission(s) marked as unread.')
     mark_as_unread.short_description = 'Mark selected as unread'
 
@@ -0,0 +1,154 @@
+# website/botfilter.py
+"""
+Memory-bounded flood detection.
+
+Request rates per client IP and per subnet (/24 for IPv4, /64 for IPv6) are
+estimated with count-min sketches: fixed-size counter arrays that never grow
+with the number of distinct clients. The window is split into time buckets,
+each with its own sketch, and the oldest bucket is cleared as time moves on,
+so old traffic decays out of the estimate. Estimates can only overcount, so
+limits should leave headroom above normal traffic.
+"""
+import hashlib
+import ipaddress
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+
+class CountMinSketch:
+    """Count-min sketch over a flat array of depth x width 32-bit counters"""
+
+    def __init__(self, width, depth):
+        if not 1 <= depth <= 16:
+            raise ValueError('depth must be between 1 and 16')
+        self.width = width
+        self.depth = depth
+        self.table = array('I', bytes(4 * width * depth))
+
+    def indexes(self, key):
+        """One counter position per row, derived from a single hash"""
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [
+            row * self.width + int.from_bytes(digest[4 * row:4 * row + 4], 'little') % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, indexes):
+        """Count one occurrence (conservative update) and return the new estimate"""
+        table = self.table
+        estimate = min(table[i] for i in indexes) + 1
+        for i in indexes:
+            if table[i] < estimate:
+                table[i] = estimate
+        return estimate
+
+    def estimate(self, indexes):
+        return min(self.table[i] for i in indexes)
+
+    def clear(self):
+        self.table = array('I', bytes(4 * self.width * self.depth))
+
+
+class SlidingRateSketch:
+    """Approximate per-key event counts over a sliding window"""
+
+    def __init__(self, window, buckets, width, depth):
+        self.slot_seconds = window / buckets
+        self.sketches = [CountMinSketch(width, depth) for _ in range(buckets)]
+        self.slots = [None] * buckets
+
+    def hit(self, key, now):
+        """Record an event for key and return its estimated count in the window"""
+        slot = int(now // self.slot_seconds)
+        current = slot % len(self.sketches)
+        if self.slots[current] != slot:
+            # This bucket last held an expired slot
+            self.sketches[current].clear()
+            self.slots[current] = slot
+
+        first = self.sketches[current]
+        indexes = first.indexes(key)
+        total = first.add(indexes)
+        for position, sketch in enumerate(self.sketches):
+            if position != current and self.slots[position] is not None and slot - self.slots[position] < len(self.sketches):
+                total += sketch.estimate(indexes)
+        return total
+
+
+class BotFilter:
+    """Decide whether a client IP is flooding, from per-IP and per-subnet rates"""
+
+    def __init__(self, ip_limit, subnet_limit, window=60, buckets=6, width=4096, depth=4):
+        self.ip_limit = ip_limit
+        self.subnet_limit = subnet_limit
+        self.window = window
+        self.sketch = SlidingRateSketch(window, buckets, width, depth)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def subnet(ip):
+        head, dot, _ = ip.rpartition('.')
+        if dot and ':' not in ip:
+            # Plain IPv4: cheaper than going through ipaddress on every request
+            return f'{head}.0/24'
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return ip
+        prefix = 24 if address.version == 4 else 64
+        return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+    def allow(self, ip, now=None):
+        """Count a request from ip; False if it or its subnet is over the limit"""
+        ip = (ip or '').strip()
+        now = time.monotonic() if now is None else now
+        subnet = self.subnet(ip)
+        with self.lock:
+            ip_rate = self.sketch.hit(f'ip:{ip}', now)
+            subnet_rate = self.sketch.hit(f'net:{subnet}', now)
+        return ip_rate <= self.ip_limit and subnet_rate <= self.subnet_limit
+
+
+# Body of the 429 sent to rejected clients, with Retry-After set to the window
+REJECTED_MESSAGE = 'Too many requests.'
+
+
+def client_ip(meta):
+    """
+    The address to rate-limit, from request.META or a WSGI environ.
+
+    Each of the BOT_FILTER_TRUSTED_PROXIES proxies in front of the app
+    appends the address it saw to X-Forwarded-For, and the client controls
+    everything to the left of that. So the key is the n-th entry from the
+    right, or REMOTE_ADDR when no proxy is trusted; a spoofed entry must not
+    move a client into a fresh bucket.
+    """
+    trusted_proxies = getattr(settings, 'BOT_FILTER_TRUSTED_PROXIES', 1)
+    forwarded = meta.get('HTTP_X_FORWARDED_FOR')
+    if not trusted_proxies or not forwarded:
+        return meta.get('REMOTE_ADDR')
+    hops = forwarded.split(',')
+    # Fewer hops than proxies: the request skipped the outer ones, and the
+    # leftmost entry was still appended by a proxy we trust
+    return hops[-min(trusted_proxies, len(hops))].strip()
+
+
+_filter = None
+
+
+def get_filter():
+    """The process-wide filter configured from settings"""
+    global _filter
+    if _filter is None:
+        _filter = BotFilter(
+            ip_limit=getattr(settings, 'BOT_FILTER_IP_LIMIT', 300),
+            subnet_limit=getattr(settings, 'BOT_FILTER_SUBNET_LIMIT', 1200),
+            window=getattr(settings, 'BOT_FILTER_WINDOW', 60),
+            buckets=getattr(settings, 'BOT_FILTER_BUCKETS', 6),
+            width=getattr(settings, 'BOT_FILTER_WIDTH', 4096),
+            depth=getattr(settings, 'BOT_FILTER_DEPTH', 4),
+        )
+    return _filter
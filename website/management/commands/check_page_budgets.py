@@ -0,0 +1,202 @@
+import gzip
+import json
+import posixpath
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from whitenoise.compress import Compressor
+
+from website.views import FACULTY_PROFILES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CSS_URL_RE = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)|@import\s+[\'"]([^\'"]+)[\'"]')
+
+# Link relations that make the browser download the target
+FETCHED_LINK_RELS = {'stylesheet', 'preload', 'modulepreload', 'icon', 'shortcut', 'apple-touch-icon', 'manifest'}
+
+METRICS = ('requests', 'raw_kb', 'gzip_kb', 'brotli_kb')
+
+# WhiteNoise's own rules for which files get compressed variants
+compressor = Compressor(quiet=True)
+
+
+class SubresourceParser(HTMLParser):
+    """Collect URLs the browser fetches while loading a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and FETCHED_LINK_RELS & set((attrs.get('rel') or '').lower().split()):
+            self.urls.append(attrs.get('href'))
+        elif tag in ('script', 'img', 'source', 'iframe', 'audio', 'video', 'embed'):
+            self.urls.append(attrs.get('src'))
+            if tag == 'video':
+                self.urls.append(attrs.get('poster'))
+        if attrs.get('srcset'):
+            # Count the first candidate; a browser fetches only one
+            self.urls.append(attrs['srcset'].split(',')[0].strip().split(' ')[0])
+
+
+def public_routes():
+    """(budget key, URL) for every public page"""
+    routes = [('home', reverse('home')), ('faculty', reverse('faculty'))]
+    routes += [
+        (f'faculty_profile:{slug}', reverse('faculty_profile', args=[slug]))
+        for slug in FACULTY_PROFILES
+    ]
+    return routes
+
+
+def transfer_sizes(name, content):
+    """Bytes on the wire raw, gzipped and Brotli-compressed"""
+    raw = len(content)
+    if not compressor.should_compress(name):
+        # Already-compressed formats (JPEG, WOFF2...) are served as they are
+        return raw, raw, raw
+    gzipped = min(raw, len(gzip.compress(content, compresslevel=9, mtime=0)))
+    brotlied = min(raw, len(brotli.compress(content))) if brotli else None
+    return raw, gzipped, brotlied
+
+
+class Command(BaseCommand):
+    help = 'Render every public page, total its transfer size and fail if a page-weight budget is exceeded'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--config', default=str(Path(settings.BASE_DIR) / 'page_budgets.json'),
+            help='JSON file with per-route budgets (default: page_budgets.json)',
+        )
+
+    # Pages are rendered in-process: keep them out of the access log and let
+    # one client fetch every asset without tripping the flood filter
+    @override_settings(ACCESS_LOG_ENABLE=False, BOT_FILTER_ENABLE=False)
+    def handle(self, *args, **options):
+        try:
+            with open(options['config']) as f:
+                budgets = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read budgets from {options['config']}: {e}")
+
+        if brotli is None:
+            self.stderr.write('brotli is not installed; Brotli sizes and budgets are skipped.')
+
+        self.manifest = self.load_manifest()
+        client = Client()
+        failures = []
+
+        header = f"{'route':<24}{'requests':>9}{'raw KB':>10}{'gzip KB':>10}{'br KB':>10}"
+        self.stdout.write(header)
+        for key, url in public_routes():
+            entries = self.page_entries(client, url)
+            totals = {
+                'requests': len(entries),
+                'raw_kb': sum(e['raw'] for e in entries) / 1024,
+                'gzip_kb': sum(e['gzip'] for e in entries) / 1024,
+                'brotli_kb': sum(e['brotli'] for e in entries) / 1024 if brotli else None,
+            }
+            self.stdout.write(
+                f"{key:<24}{totals['requests']:>9}{totals['raw_kb']:>10.1f}{totals['gzip_kb']:>10.1f}"
+                + (f"{totals['brotli_kb']:>10.1f}" if brotli else f"{'-':>10}")
+            )
+
+            budget = {
+                **budgets.get('default', {}),
+                **budgets.get('routes', {}).get(key.split(':')[0], {}),
+                **budgets.get('routes', {}).get(key, {}),
+            }
+            exceeded = [
+                f'{metric} {totals[metric]:.1f} > {budget[metric]}'
+                for metric in METRICS
+                if metric in budget and totals[metric] is not None and totals[metric] > budget[metric]
+            ]
+            if exceeded:
+                failures.append((key, url, exceeded, entries))
+
+        if failures:
+            for key, url, exceeded, entries in failures:
+                self.stderr.write(f"\n{key} ({url}) over budget: {', '.join(exceeded)}")
+                for entry in sorted(entries, key=lambda e: e['raw'], reverse=True):
+                    br = f"{entry['brotli'] / 1024:>9.1f} KB br" if brotli else ''
+                    self.stderr.write(
+                        f"  {entry['raw'] / 1024:>9.1f} KB raw {entry['gzip'] / 1024:>9.1f} KB gzip{br}  {entry['url']}"
+                    )
+            raise CommandError(f'{len(failures)} route(s) over their page-weight budget.')
+        self.stdout.write(self.style.SUCCESS('All routes within budget.'))
+
+    def load_manifest(self):
+        """Map hashed static names back to source names when a manifest is in use"""
+        if isinstance(staticfiles_storage, ManifestFilesMixin):
+            return {hashed: name for name, hashed in staticfiles_storage.hashed_files.items()}
+        return {}
+
+    def page_entries(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        html = b''.join(response.streaming_content) if response.streaming else response.content
+
+        entries = [self.entry(url, 'page.html', html)]
+        seen = set()
+        pending = self.subresources(url, html.decode(response.charset or 'utf-8'), 'html')
+        while pending:
+            asset_url = pending.pop(0)
+            if asset_url in seen:
+                continue
+            seen.add(asset_url)
+            name, content = self.resolve(asset_url)
+            if content is None:
+                # External or unresolvable: still costs a request
+                entries.append({'url': asset_url, 'raw': 0, 'gzip': 0, 'brotli': 0})
+                continue
+            entries.append(self.entry(asset_url, name, content))
+            if name.endswith('.css'):
+                pending += self.subresources(asset_url, content.decode('utf-8', 'replace'), 'css')
+        return entries
+
+    def entry(self, url, name, content):
+        raw, gzipped, brotlied = transfer_sizes(name, content)
+        return {'url': url, 'raw': raw, 'gzip': gzipped, 'brotli': brotlied}
+
+    def subresources(self, base_url, text, kind):
+        if kind == 'css':
+            urls = [m.group(1) or m.group(2) for m in CSS_URL_RE.finditer(text)]
+        else:
+            parser = SubresourceParser()
+            parser.feed(text)
+            urls = parser.urls
+        return [
+            urljoin(base_url, u.strip()) for u in urls
+            if u and not u.strip().startswith(('data:', '#'))
+        ]
+
+    def resolve(self, url):
+        """Find the file behind a static URL; returns (name, bytes) or (url, None)"""
+        parts = urlsplit(url)
+        if parts.netloc or not parts.path.startswith(settings.STATIC_URL):
+            return url, None
+        served = posixpath.normpath(parts.path[len(settings.STATIC_URL):])
+        name = self.manifest.get(served, served)
+        path = None
+        if staticfiles_storage.exists(served):
+            path = staticfiles_storage.path(served)
+        else:
+            path = finders.find(name)
+        if not path:
+            return url, None
+        with open(path, 'rb') as f:
+            return name, f.read()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from website import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily submission rollups from the raw contact submissions'
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup row(s).'))
@@ -1,7 +1,93 @@
 # website/middleware.py
+import cProfile
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.http import JsonResponse, HttpResponse
 from django_ratelimit.exceptions import Ratelimited
 
+from . import accesslog, botfilter, profiling
+from .views import get_client_ip
+
+class BotFilterMiddleware:
+    """
+    Reject obvious floods before the rest of the stack runs.
+
+    Placed right after AccessLogMiddleware, so rejected requests are logged
+    but never reach URL resolution, the cache or the database. Rates are
+    estimated in fixed memory by website.botfilter.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BOT_FILTER_ENABLE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.filter = botfilter.get_filter()
+
+    def __call__(self, request):
+        if not self.filter.allow(botfilter.client_ip(request.META)):
+            request.flooded = True
+            response = HttpResponse(botfilter.REJECTED_MESSAGE, status=429, content_type='text/plain')
+            response['Retry-After'] = str(self.filter.window)
+            return response
+        return self.get_response(request)
+
+
+class AccessLogMiddleware:
+    """
+    Write one structured JSONL record per request.
+
+    Placed first in MIDDLEWARE so the latency covers the whole stack and
+    the 429s from BotFilterMiddleware are logged too. For streamed responses
+    it is the time until the headers were ready.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ACCESS_LOG_ENABLE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.writer = accesslog.get_writer()
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        latency = time.perf_counter() - start
+
+        # django-ratelimit (and the contact view) set request.limited when a
+        # limit was checked; None means no limit applied to this request.
+        # BotFilterMiddleware sets request.flooded when it rejects a request.
+        limited = getattr(request, 'limited', None)
+        if getattr(request, 'flooded', False):
+            ratelimit = 'flood'
+        elif limited is not None:
+            ratelimit = 'limited' if limited else 'passed'
+        else:
+            ratelimit = None
+        self.writer.write({
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.path,
+            'route': request.resolver_match.view_name if request.resolver_match else None,
+            'status': response.status_code,
+            'latency_ms': round(latency * 1000, 3),
+            'queries': queries[0],
+            'ip': get_client_ip(request),
+            'ratelimit': ratelimit,
+        })
+        return response
+
+
 class RateLimitMiddleware:
     """Custom middleware to handle rate limit exceptions"""
     
@@ -57,4 +143,131 @@ class RateLimitMiddleware:
                 """,
                 status=429
             )
-        return None
\ No newline at end of file
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in, sampled memory and CPU profiling of requests.
+
+    With PROFILING_ENABLE off the middleware removes itself from the stack at
+    startup. When on, PROFILING_SAMPLE_RATE of requests are traced with
+    tracemalloc (allocation delta, peak and top allocation sites) and
+    PROFILING_CPROFILE_RATE are run under cProfile. Results go to the bounded
+    buffer in website.profiling.
+
+    tracemalloc sees every thread, so with gthread workers a memory sample
+    also counts what concurrent requests allocated; sample with the sync
+    worker class for clean figures. Tracing stops when the view returns, so
+    the memory of a streamed body is not included. cProfile only follows the
+    calling thread and keeps running for streamed bodies until the server
+    closes the response.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.01)
+        self.cprofile_rate = getattr(settings, 'PROFILING_CPROFILE_RATE', 0.001)
+        self.top_n = getattr(settings, 'PROFILING_TOP_N', 10)
+
+    def __call__(self, request):
+        trace_memory = random.random() < self.sample_rate
+        run_cprofile = random.random() < self.cprofile_rate
+        if not (trace_memory or run_cprofile):
+            return self.get_response(request)
+        # Skip rather than wait if another thread is being profiled
+        if not profiling.profile_slot.acquire(blocking=False):
+            return self.get_response(request)
+        return self.profile(request, trace_memory, run_cprofile)
+
+    def profile(self, request, trace_memory, run_cprofile):
+        entry = {'method': request.method}
+        started_tracing = False
+        profiler = cProfile.Profile() if run_cprofile else None
+        start = time.perf_counter()
+        try:
+            if trace_memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    started_tracing = True
+                before = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+
+            # tracemalloc is process-wide, so stop tracing before the response
+            # goes back to the server rather than while the body is streamed.
+            if trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry['alloc_delta'] = current - baseline
+                entry['peak'] = peak - baseline
+                entry['top_allocations'] = profiling.top_allocations(
+                    before, tracemalloc.take_snapshot(), self.top_n
+                )
+        except BaseException:
+            profiling.profile_slot.release()
+            raise
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        entry['route'] = request.resolver_match.view_name if request.resolver_match else request.path
+        entry['status'] = response.status_code
+        entry['streamed'] = response.streaming
+
+        def finish():
+            try:
+                entry['duration'] = round(time.perf_counter() - start, 6)
+                if profiler:
+                    entry['hottest_functions'] = profiling.hottest_functions(profiler, self.top_n)
+                profiling.record(entry)
+            finally:
+                profiling.profile_slot.release()
+
+        if response.streaming and profiler:
+            # Streamed bodies are rendered after we return; the server closes
+            # the response when it is done with it, iterated or not (HEAD).
+            response.streaming_content = ProfiledStream(response.streaming_content, profiler, finish)
+        else:
+            finish()
+        return response
+
+
+class ProfiledStream:
+    """Streamed body that runs cProfile while each chunk is produced"""
+
+    def __init__(self, content, profiler, on_close):
+        self.iterator = iter(content)
+        self.profiler = profiler
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Only profile producing the chunks, not the time spent sending them
+        self.profiler.enable()
+        try:
+            return next(self.iterator)
+        finally:
+            self.profiler.disable()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if hasattr(self.iterator, 'close'):
+                self.iterator.close()
+        finally:
+            self.on_close()
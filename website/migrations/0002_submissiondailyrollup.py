@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    ContactSubmission = apps.get_model('website', 'ContactSubmission')
+    SubmissionDailyRollup = apps.get_model('website', 'SubmissionDailyRollup')
+    groups = (
+        ContactSubmission.objects.order_by()
+        .annotate(day=TruncDate('submitted_at'))
+        .values('day', 'interest')
+        .annotate(total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+    )
+    SubmissionDailyRollup.objects.bulk_create(
+        SubmissionDailyRollup(**group) for group in groups
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('interest', models.CharField(blank=True, choices=[('volunteer', 'Volunteer'), ('donate', 'Donate'), ('partner', 'Partnership'), ('other', 'Other')], max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Submission Daily Rollup',
+                'verbose_name_plural': 'Submission Daily Rollups',
+                'ordering': ['-day', 'interest'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'interest'), name='unique_rollup_day_interest')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 class ContactSubmission(models.Model):
@@ -24,4 +24,56 @@ class ContactSubmission(models.Model):
         verbose_name_plural = 'Contact Submissions'
     
     def __str__(self):
-        return f"{self.name} - {self.email} ({self.submitted_at.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"{self.name} - {self.email} ({self.submitted_at.strftime('%Y-%m-%d')})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the row contributed to the rollups when it was loaded
+        if not instance.get_deferred_fields():
+            from .rollups import rollup_state
+            instance._rollup_state = rollup_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save and move this submission's counts between daily rollups"""
+        from .rollups import rollup_state, stored_rollup_state, apply_state_change
+        with transaction.atomic():
+            old_state = getattr(self, '_rollup_state', None)
+            if old_state is None and self.pk is not None:
+                # Loaded with deferred fields or built in memory with a pk:
+                # take what the row contributed from the database.
+                old_state = stored_rollup_state(self.pk)
+            super().save(*args, **kwargs)
+            new_state = rollup_state(self)
+            apply_state_change(old_state, new_state)
+        self._rollup_state = new_state
+
+    def delete(self, *args, **kwargs):
+        """Delete and remove this submission from the daily rollups"""
+        from .rollups import stored_rollup_state, apply_state_change
+        with transaction.atomic():
+            state = getattr(self, '_rollup_state', None) or stored_rollup_state(self.pk)
+            result = super().delete(*args, **kwargs)
+            apply_state_change(state, None)
+        return result
+
+
+class SubmissionDailyRollup(models.Model):
+    """Submission counters per day and interest, kept up to date incrementally"""
+
+    day = models.DateField()
+    interest = models.CharField(max_length=20, choices=ContactSubmission.INTEREST_CHOICES, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', 'interest']
+        verbose_name = 'Submission Daily Rollup'
+        verbose_name_plural = 'Submission Daily Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'interest'], name='unique_rollup_day_interest'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.interest or '-'}: {self.total} ({self.unread} unread)"
\ No newline at end of file
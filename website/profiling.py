@@ -0,0 +1,105 @@
+# website/profiling.py
+"""
+Bounded, per-process buffer of request profiles.
+
+ProfilingMiddleware records one entry per sampled request; the profiling
+endpoint summarises them per route. Each gunicorn worker keeps its own buffer,
+so the report describes the worker that served it.
+"""
+import os
+import pstats
+import threading
+import tracemalloc
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_profiles = deque(maxlen=getattr(settings, 'PROFILING_BUFFER_SIZE', 200))
+
+# Only one request per process is profiled at a time, so two samples never
+# share (or stop) the same tracemalloc session. This does not keep other
+# threads' allocations out of a sample; see ProfilingMiddleware.
+profile_slot = threading.Lock()
+
+
+def top_allocations(before, after, limit):
+    """Allocation sites that grew the most between two tracemalloc snapshots"""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+    return [
+        {
+            'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+        }
+        for stat in stats[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def hottest_functions(profiler, limit):
+    """Functions with the most own time in a cProfile run"""
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    return [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in ranked[:limit]
+    ]
+
+
+def record(profile):
+    with _lock:
+        _profiles.append(profile)
+
+
+def clear():
+    with _lock:
+        _profiles.clear()
+
+
+def report(limit=10):
+    """Per-route summary of the buffered profiles"""
+    with _lock:
+        profiles = list(_profiles)
+
+    routes = defaultdict(lambda: {
+        'requests': 0,
+        'memory_samples': 0,
+        'alloc_delta_total': 0,
+        'peak_max': 0,
+        'sites': defaultdict(int),
+        'functions': defaultdict(float),
+    })
+    for profile in profiles:
+        route = routes[profile['route']]
+        route['requests'] += 1
+        if 'alloc_delta' in profile:
+            route['memory_samples'] += 1
+            route['alloc_delta_total'] += profile['alloc_delta']
+            route['peak_max'] = max(route['peak_max'], profile['peak'])
+            for site in profile['top_allocations']:
+                route['sites'][site['site']] += site['size_diff']
+        for function in profile.get('hottest_functions', ()):
+            route['functions'][function['function']] += function['tottime']
+
+    summary = {}
+    for name, route in routes.items():
+        samples = route['memory_samples']
+        summary[name] = {
+            'requests': route['requests'],
+            'memory_samples': samples,
+            'alloc_delta_mean': route['alloc_delta_total'] // samples if samples else None,
+            'peak_max': route['peak_max'] if samples else None,
+            'top_allocations': sorted(route['sites'].items(), key=lambda i: i[1], reverse=True)[:limit],
+            'hottest_functions': [
+                (function, round(tottime, 6))
+                for function, tottime in sorted(route['functions'].items(), key=lambda i: i[1], reverse=True)[:limit]
+            ],
+        }
+    return {'pid': os.getpid(), 'buffered': len(profiles), 'routes': summary}
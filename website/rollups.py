@@ -0,0 +1,114 @@
+# website/rollups.py
+"""
+Incremental daily rollups of contact submissions.
+
+Every change to a ContactSubmission moves its contribution (one to ``total``,
+one to ``unread`` while unread) between SubmissionDailyRollup rows keyed by
+day and interest, so the admin dashboard never has to scan submissions.
+Bulk queryset updates bypass save(), so they go through set_read() and
+delete_submissions() instead.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ContactSubmission, SubmissionDailyRollup
+
+
+def rollup_state(submission):
+    """The (day, interest, is_read) a submission contributes to"""
+    day = timezone.localtime(submission.submitted_at).date()
+    return (day, submission.interest, submission.is_read)
+
+
+def stored_rollup_state(pk):
+    """The (day, interest, is_read) the stored row contributes, or None if there is no row"""
+    row = (
+        ContactSubmission.objects.select_for_update()
+        .filter(pk=pk)
+        .values('submitted_at', 'interest', 'is_read')
+        .first()
+    )
+    if row is None:
+        return None
+    return (timezone.localtime(row['submitted_at']).date(), row['interest'], row['is_read'])
+
+
+def apply_delta(day, interest, total=0, unread=0):
+    """Add to the counters of one rollup row, creating it if needed"""
+    if not total and not unread:
+        return
+    rows = SubmissionDailyRollup.objects.filter(day=day, interest=interest)
+    if rows.update(total=F('total') + total, unread=F('unread') + unread):
+        return
+    try:
+        with transaction.atomic():
+            SubmissionDailyRollup.objects.create(
+                day=day, interest=interest, total=total, unread=unread
+            )
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(total=F('total') + total, unread=F('unread') + unread)
+
+
+def apply_state_change(old_state, new_state):
+    """Move one submission's contribution from old_state to new_state"""
+    if old_state == new_state:
+        return
+    if old_state is not None:
+        day, interest, is_read = old_state
+        apply_delta(day, interest, total=-1, unread=0 if is_read else -1)
+    if new_state is not None:
+        day, interest, is_read = new_state
+        apply_delta(day, interest, total=1, unread=0 if is_read else 1)
+
+
+def _grouped_counts(queryset):
+    """Count submissions in a queryset per (day, interest)"""
+    return (
+        queryset.order_by()
+        .annotate(day=TruncDate('submitted_at'))
+        .values('day', 'interest')
+        .annotate(total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+    )
+
+
+def set_read(queryset, is_read):
+    """Bulk-update is_read and adjust the unread counters; returns rows changed"""
+    changing = queryset.exclude(is_read=is_read)
+    sign = -1 if is_read else 1
+    with transaction.atomic():
+        groups = list(_grouped_counts(changing))
+        updated = changing.update(is_read=is_read)
+        for group in groups:
+            apply_delta(group['day'], group['interest'], unread=sign * group['total'])
+    return updated
+
+
+def delete_submissions(queryset):
+    """Bulk-delete submissions and remove them from the rollups"""
+    with transaction.atomic():
+        groups = list(_grouped_counts(queryset))
+        result = queryset.delete()
+        for group in groups:
+            apply_delta(group['day'], group['interest'],
+                        total=-group['total'], unread=-group['unread'])
+    return result
+
+
+def rebuild():
+    """Recompute every rollup row from the raw submissions"""
+    with transaction.atomic():
+        SubmissionDailyRollup.objects.all().delete()
+        rollups = [
+            SubmissionDailyRollup(
+                day=group['day'],
+                interest=group['interest'],
+                total=group['total'],
+                unread=group['unread'],
+            )
+            for group in _grouped_counts(ContactSubmission.objects.all())
+        ]
+        SubmissionDailyRollup.objects.bulk_create(rollups)
+    return len(rollups)
@@ -0,0 +1,72 @@
+# website/streaming.py
+from django.contrib import messages
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.context import make_context
+from django.template.defaulttags import CsrfTokenNode
+from django.template.loader import get_template
+from django.templatetags.static import static
+
+# Body chunks are coalesced up to this size before being sent
+CHUNK_SIZE = 8 * 1024
+
+HEAD_END = '</head>'
+
+
+def _render_nodes(template, context):
+    """Yield the rendered output of each top-level node of a template"""
+    engine_template = template.template
+    with context.render_context.push_state(engine_template):
+        with context.bind_template(engine_template):
+            context.template_name = engine_template.name
+            for node in engine_template.nodelist:
+                yield node.render_annotated(context)
+
+
+def _chunks(parts):
+    """Flush everything up to </head> at once, then the body in CHUNK_SIZE pieces"""
+    buffer = []
+    size = 0
+    head_sent = False
+    for part in parts:
+        if not part:
+            continue
+        buffer.append(part)
+        size += len(part)
+        if not head_sent:
+            if HEAD_END not in part:
+                continue
+            head_sent = True
+        elif size < CHUNK_SIZE:
+            continue
+        yield ''.join(buffer)
+        buffer = []
+        size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_render(request, template_name, context=None, stylesheets=('style.css',)):
+    """
+    Streaming counterpart of django.shortcuts.render().
+
+    The document head is sent as soon as it is rendered so the browser can
+    start fetching stylesheets while the body is still being produced.
+    """
+    template = get_template(template_name)
+
+    # The body is rendered after the middleware has already processed the
+    # response, so anything that has to land in response headers or cookies
+    # must happen now: issue the CSRF token if the page has a form (sets the
+    # csrftoken cookie) and consume pending messages (so they are cleared
+    # from storage).
+    if template.template.nodelist.get_nodes_by_type(CsrfTokenNode):
+        get_token(request)
+    list(messages.get_messages(request))
+
+    ctx = make_context(context, request, autoescape=template.backend.engine.autoescape)
+    response = StreamingHttpResponse(_chunks(_render_nodes(template, ctx)))
+    response['Link'] = ', '.join(
+        f'<{static(path)}>; rel=preload; as=style' for path in stylesheets
+    )
+    return response
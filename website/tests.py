@@ -1,3 +1,393 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from STEMCURES.fastpath import CSRF_FIELD_RE, FastPathDispatcher
+
+from . import accesslog, botfilter, profiling, rollups
+from .middleware import AccessLogMiddleware, BotFilterMiddleware, ProfilingMiddleware
+from .models import ContactSubmission, SubmissionDailyRollup
+
+
+class SubmissionRollupTests(TestCase):
+    """The rollup table must always equal a GROUP BY over the submissions"""
+
+    def assertRollupsMatch(self):
+        expected = {
+            (row['day'], row['interest']): (row['total'], row['unread'])
+            for row in rollups._grouped_counts(ContactSubmission.objects.all())
+        }
+        actual = {
+            (row.day, row.interest): (row.total, row.unread)
+            for row in SubmissionDailyRollup.objects.exclude(total=0)
+        }
+        self.assertEqual(actual, expected)
+
+    def create(self, interest='volunteer', **kwargs):
+        return ContactSubmission.objects.create(
+            name='Test', email='test@example.com', interest=interest,
+            message='A test message', **kwargs
+        )
+
+    def test_create(self):
+        self.create()
+        self.create()
+        self.create(interest='donate', is_read=True)
+        self.assertRollupsMatch()
+
+    def test_save_loaded_instance(self):
+        submission = ContactSubmission.objects.get(pk=self.create().pk)
+        submission.is_read = True
+        submission.interest = 'partner'
+        submission.save()
+        self.assertRollupsMatch()
+
+    def test_save_with_deferred_fields(self):
+        pk = self.create().pk
+        submission = ContactSubmission.objects.only('name').get(pk=pk)
+        submission.is_read = True
+        submission.save()
+        self.assertRollupsMatch()
+
+    def test_save_unloaded_instance_with_existing_pk(self):
+        original = self.create()
+        ContactSubmission(
+            pk=original.pk, name='Test', email='test@example.com', interest='donate',
+            message='A test message', submitted_at=original.submitted_at,
+        ).save()
+        self.assertRollupsMatch()
+
+    def test_set_read(self):
+        self.create()
+        self.create()
+        self.create(interest='donate')
+        queryset = ContactSubmission.objects.filter(interest='volunteer')
+        self.assertEqual(rollups.set_read(queryset, True), 2)
+        self.assertRollupsMatch()
+        self.assertEqual(rollups.set_read(queryset, True), 0)
+        rollups.set_read(ContactSubmission.objects.all(), False)
+        self.assertRollupsMatch()
+
+    def test_delete(self):
+        first = self.create()
+        self.create(interest='donate')
+        ContactSubmission.objects.get(pk=first.pk).delete()
+        self.assertRollupsMatch()
+        rollups.delete_submissions(ContactSubmission.objects.all())
+        self.assertRollupsMatch()
+
+    def test_rebuild(self):
+        self.create()
+        self.create(interest='donate', is_read=True)
+        SubmissionDailyRollup.objects.update(total=99, unread=99)
+        rollups.rebuild()
+        self.assertRollupsMatch()
+
+
+@override_settings(
+    PROFILING_ENABLE=True, PROFILING_SAMPLE_RATE=1, PROFILING_CPROFILE_RATE=1,
+    ACCESS_LOG_ENABLE=False, BOT_FILTER_ENABLE=False,
+)
+class ProfilingMiddlewareTests(TestCase):
+    """A sampled request must always give back the profiling slot and stop tracing"""
+
+    def setUp(self):
+        profiling.clear()
+
+    def assertCleanedUp(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertFalse(profiling.profile_slot.locked())
+
+    def test_streamed_body_never_iterated(self):
+        response = self.client.head('/faculty/')
+        self.assertTrue(response.streaming)
+        self.assertFalse(tracemalloc.is_tracing())
+        # What the server does with a HEAD response
+        response.close()
+        self.assertCleanedUp()
+        [entry] = profiling.report()['routes'].values()
+        self.assertEqual(entry['memory_samples'], 1)
+
+    def test_streamed_body(self):
+        response = self.client.get('/faculty/')
+        b''.join(response.streaming_content)
+        response.close()
+        self.assertCleanedUp()
+        self.assertTrue(profiling.report()['routes']['faculty']['hottest_functions'])
+
+    def test_view_raises(self):
+        def get_response(request):
+            raise ValueError
+
+        middleware = ProfilingMiddleware(get_response)
+        with self.assertRaises(ValueError):
+            middleware(RequestFactory().get('/'))
+        self.assertCleanedUp()
+
+
+class BotFilterClientIPTests(TestCase):
+    """Clients must not pick their own rate-limit key through X-Forwarded-For"""
+
+    @override_settings(BOT_FILTER_TRUSTED_PROXIES=1)
+    def test_one_proxy(self):
+        meta = {'HTTP_X_FORWARDED_FOR': '1.2.3.4, 10.0.0.7', 'REMOTE_ADDR': '10.1.1.1'}
+        self.assertEqual(botfilter.client_ip(meta), '10.0.0.7')
+        ips = {
+            botfilter.client_ip({'HTTP_X_FORWARDED_FOR': f'192.0.2.{i}, 203.0.113.5'})
+            for i in range(10)
+        }
+        self.assertEqual(ips, {'203.0.113.5'})
+
+    @override_settings(BOT_FILTER_TRUSTED_PROXIES=2)
+    def test_two_proxies(self):
+        meta = {'HTTP_X_FORWARDED_FOR': '192.0.2.1, 203.0.113.5, 198.51.100.9'}
+        self.assertEqual(botfilter.client_ip(meta), '203.0.113.5')
+        # Came in through the inner proxy only
+        self.assertEqual(botfilter.client_ip({'HTTP_X_FORWARDED_FOR': '203.0.113.5'}), '203.0.113.5')
+
+    @override_settings(BOT_FILTER_TRUSTED_PROXIES=0)
+    def test_spoofed_header_without_proxy(self):
+        ips = {
+            botfilter.client_ip({'HTTP_X_FORWARDED_FOR': f'192.0.2.{i}', 'REMOTE_ADDR': '203.0.113.5'})
+            for i in range(10)
+        }
+        self.assertEqual(ips, {'203.0.113.5'})
+
+
+@override_settings(ACCESS_LOG_ENABLE=True, BOT_FILTER_ENABLE=True)
+class BotFilterMiddlewareTests(TestCase):
+    """Flood rejections are logged as their own rate-limit outcome"""
+
+    def test_rejection_logged_as_flood(self):
+        writer = mock.Mock()
+        flood = botfilter.BotFilter(ip_limit=0, subnet_limit=0)
+        with mock.patch.object(accesslog, 'get_writer', return_value=writer), \
+                mock.patch.object(botfilter, '_filter', flood):
+            middleware = AccessLogMiddleware(BotFilterMiddleware(mock.Mock()))
+            response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response.status_code, 429)
+        [record], _ = writer.write.call_args
+        self.assertEqual(record['ratelimit'], 'flood')
+
+
+@override_settings(ACCESS_LOG_ENABLE=False, BOT_FILTER_ENABLE=False)
+class FastPathTests(TestCase):
+    """Fast-path responses must be interchangeable with Django's"""
+
+    def setUp(self):
+        self.app = FastPathDispatcher(WSGIHandler(), ['/', '/faculty/', '/missing/'])
+
+    def call(self, path, method='GET', app=None, **extra):
+        """Run one request through the dispatcher; returns (status, headers, body)"""
+        extra.setdefault('HTTP_HOST', 'testserver')
+        environ = RequestFactory().generic(method, path, **extra).environ
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = dict(headers)
+
+        # Keep the test transaction's connection open, as the test client does
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            result = (app or self.app)(environ, start_response)
+            body = b''.join(result)
+            if hasattr(result, 'close'):
+                result.close()
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        return int(captured['status'].split()[0]), captured['headers'], body
+
+    def test_stitched_gzip(self):
+        self.call('/')
+        _, _, identity = self.call('/', HTTP_ACCEPT_ENCODING='identity')
+        status, headers, body = self.call('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        unzipped = gzip.decompress(body)
+        self.assertEqual(CSRF_FIELD_RE.sub(rb'\1TOKEN\3', unzipped), CSRF_FIELD_RE.sub(rb'\1TOKEN\3', identity))
+        self.assertNotEqual(CSRF_FIELD_RE.search(unzipped)[2], CSRF_FIELD_RE.search(identity)[2])
+
+    def test_spliced_csrf_token_accepted(self):
+        self.call('/')
+        _, headers, body = self.call('/')
+        token = CSRF_FIELD_RE.search(body)[2].decode()
+        cookie = re.match(r'csrftoken=([^;]+)', headers['Set-Cookie'])[1]
+
+        client = Client(enforce_csrf_checks=True)
+        client.cookies['csrftoken'] = cookie
+        response = client.post('/contact/', {
+            'csrfmiddlewaretoken': token, 'name': 'Test', 'email': 'test@example.com',
+            'interest': 'volunteer', 'message': 'A message long enough to pass validation',
+        })
+        self.assertNotEqual(response.status_code, 403)
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_not_modified(self):
+        self.call('/faculty/')
+        _, headers, _ = self.call('/faculty/')
+        status, _, body = self.call('/faculty/', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_falls_through(self):
+        calls = []
+
+        def application(environ, start_response):
+            calls.append(environ['PATH_INFO'])
+            status = '200 OK' if environ['PATH_INFO'] == '/' else '404 Not Found'
+            start_response(status, [('Content-Type', 'text/html')])
+            return [b'<p>page</p>']
+
+        app = FastPathDispatcher(application, ['/', '/missing/'])
+        self.call('/', app=app)
+        self.call('/', app=app)
+        self.assertEqual(len(calls), 1)
+
+        self.call('/', app=app, HTTP_COOKIE='sessionid=abc')
+        self.call('/?page=2', app=app)
+        self.call('/', method='POST', app=app)
+        self.assertEqual(len(calls), 4)
+
+        self.call('/missing/', app=app)
+        self.call('/missing/', app=app)
+        self.assertEqual(calls[4:], ['/missing/', '/missing/'])
+
+    def test_flood_rejected_once(self):
+        self.call('/faculty/')
+        flood = botfilter.BotFilter(ip_limit=0, subnet_limit=0)
+        writer = mock.Mock()
+        with override_settings(BOT_FILTER_ENABLE=True, ACCESS_LOG_ENABLE=True), \
+                mock.patch.object(botfilter, '_filter', flood), \
+                mock.patch.object(accesslog, 'get_writer', return_value=writer), \
+                mock.patch.object(self.app, 'application') as application:
+            status, headers, body = self.call('/faculty/')
+        self.assertEqual(status, 429)
+        self.assertEqual(headers['Retry-After'], str(flood.window))
+        self.assertEqual(body, botfilter.REJECTED_MESSAGE.encode())
+        application.assert_not_called()
+        [record], _ = writer.write.call_args
+        self.assertEqual(record['ratelimit'], 'flood')
+        # Counted once: the next hit from the same address is the second
+        self.assertEqual(flood.sketch.hit('ip:127.0.0.1', time.monotonic()), 2)
+
+
+class AccessLogTests(SimpleTestCase):
+    """Rotation must not lose records, and lost records must be reported"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'access.jsonl')
+
+    def read(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as stream:
+            return [json.loads(line) for line in stream]
+
+    def test_rotation_keeps_every_record_in_order(self):
+        writer = accesslog.BufferedJSONLWriter(self.path, max_bytes=200, backup_count=20)
+        # One record per write, so the file rotates every few records
+        with mock.patch.object(accesslog, 'BATCH_SIZE', 1):
+            for seq in range(30):
+                writer.write({'seq': seq, 'path': '/faculty/', 'status': 200})
+            writer.close()
+
+        backups = sorted(
+            (name for name in os.listdir(os.path.dirname(self.path)) if name.endswith('.gz')),
+            key=lambda name: int(name.split('.')[-2]),
+        )
+        self.assertGreater(len(backups), 3)
+        self.assertEqual(backups[0], 'access.jsonl.1.gz')
+        # Oldest backup has the highest number; the live file is newest
+        records = []
+        for name in reversed(backups):
+            records += self.read(os.path.join(os.path.dirname(self.path), name))
+        records += self.read(self.path)
+        self.assertEqual([record['seq'] for record in records], list(range(30)))
+
+    def test_dropped_records_reported(self):
+        writer = accesslog.BufferedJSONLWriter(self.path, max_bytes=1 << 20, backup_count=1)
+        writer.dropped = 3
+        with self.assertLogs('website.accesslog', 'WARNING'):
+            writer.write({'seq': 0})
+            writer.close()
+        self.assertEqual(self.read(self.path), [{'seq': 0, 'dropped': 3}])
+
+    def test_analyze_plain_and_gzip_logs(self):
+        def record(status, ratelimit=None, **extra):
+            return json.dumps({
+                'ts': 1, 'method': 'GET', 'path': '/', 'route': 'home', 'status': status,
+                'latency_ms': 5, 'queries': 0, 'ip': '203.0.113.5', 'ratelimit': ratelimit, **extra,
+            }) + '\n'
+
+        with gzip.open(f'{self.path}.1.gz', 'wt') as stream:
+            stream.write(record(200) + record(429, 'limited'))
+        with open(self.path, 'w') as stream:
+            stream.write(record(200, dropped=2) + 'not json\n' + record(429, 'flood') + '{"status": 200}\n')
+
+        out = StringIO()
+        call_command('analyze_access_log', f'{self.path}*', stdout=out)
+        output = out.getvalue()
+        self.assertIn('4 requests in 2 file(s), 1 malformed line(s) skipped, 2 record(s) dropped', output)
+        self.assertIn('Rate-limited: 1 (25.00%)  flood filter: 1 (25.00%)', output)
+        self.assertIn('4xx=2 (50.00%)', output)
+
+
+@override_settings(STREAMING_RENDER=True, ACCESS_LOG_ENABLE=False, BOT_FILTER_ENABLE=False)
+class StreamingRenderTests(TestCase):
+    """Streamed pages must still issue CSRF tokens and consume messages"""
+
+    def setUp(self):
+        # The contact form's per-IP attempt counter lives in the cache
+        cache.clear()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def get_home(self):
+        response = self.client.get('/')
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csrf_token_accepted(self):
+        response, body = self.get_home()
+        self.assertIn('csrftoken', response.cookies)
+        token = CSRF_FIELD_RE.search(body.encode())[2].decode()
+        response = self.client.post('/contact/', {
+            'csrfmiddlewaretoken': token, 'name': 'Test', 'email': 'test@example.com',
+            'interest': 'volunteer', 'message': 'A message long enough to pass validation',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_message_shown_once(self):
+        text = 'Thank you for your interest in STEM CURES!'
+        _, body = self.get_home()
+        token = CSRF_FIELD_RE.search(body.encode())[2].decode()
+        self.client.post('/contact/', {
+            'csrfmiddlewaretoken': token, 'name': 'Test', 'email': 'test@example.com',
+            'interest': 'volunteer', 'message': 'A message long enough to pass validation',
+        })
+        self.assertTrue(self.client.cookies['messages'].value)
+
+        response, body = self.get_home()
+        self.assertEqual(body.count(text), 1)
+        # Consumed before the response left the middleware: cookie deleted
+        self.assertEqual(response.cookies['messages'].value, '')
+        _, body = self.get_home()
+        self.assertNotIn(text, body)
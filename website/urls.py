@@ -6,5 +6,6 @@ urlpatterns = [
     path('contact/', views.contact_submit, name='contact_submit'),
     path('faculty/', views.faculty, name='faculty'),
     path('faculty/<slug:slug>/', views.faculty_profile, name='faculty_profile'),
+    path('profiling/', views.profiling_report, name='profiling_report'),
     path('test-ratelimit/', views.test_ratelimit, name='test_ratelimit'),  # REMOVE IN PRODUCTION
 ]
\ No newline at end of file
@@ -8,32 +8,42 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
 from django_ratelimit.decorators import ratelimit
 from django.core.cache import cache
+from django.contrib.admin.views.decorators import staff_member_required
 from .models import ContactSubmission
+from . import profiling
+from .streaming import stream_render
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Faculty profile slug -> template
+FACULTY_PROFILES = {
+    'saif': 'profile-saif.html',
+}
+
+def render_page(request, template_name, context=None):
+    """Render a public page, streaming it when STREAMING_RENDER is on"""
+    if getattr(settings, 'STREAMING_RENDER', False):
+        return stream_render(request, template_name, context)
+    return render(request, template_name, context)
+
 def home(request):
     """Render the main page"""
-    return render(request, 'home.html')
+    return render_page(request, 'home.html')
 
 def faculty(request):
     """Render the faculty page"""
-    return render(request, 'faculty.html')
+    return render_page(request, 'faculty.html')
 
 def faculty_profile(request, slug):
     """Render individual faculty profile pages"""
-    profile_templates = {
-        'saif': 'profile-saif.html',
-    }
-    
-    template_name = profile_templates.get(slug)
+    template_name = FACULTY_PROFILES.get(slug)
     if not template_name:
         from django.http import Http404
         raise Http404("Faculty member not found")
     
-    return render(request, template_name)
+    return render_page(request, template_name)
 
 def get_client_ip(request):
     """Get the client's IP address"""
@@ -54,8 +64,9 @@ def contact_submit(request):
         cache_key = f'contact_ratelimit_{client_ip}'
         
         attempts = cache.get(cache_key, 0)
+        request.limited = attempts >= 3
         
-        if attempts >= 3:
+        if request.limited:
             # Rate limit exceeded
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -160,6 +171,13 @@ def contact_submit(request):
     
     return redirect('home')
 
+@staff_member_required
+def profiling_report(request):
+    """Per-route memory and CPU profiles buffered by this worker"""
+    if request.method == 'POST' and request.POST.get('clear'):
+        profiling.clear()
+    return JsonResponse(profiling.report(settings.PROFILING_TOP_N))
+
 # TEST ENDPOINT - REMOVE AFTER TESTING
 @csrf_exempt
 @ratelimit(key='ip', rate='3/h', method='POST', block=True)